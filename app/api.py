@@ -1,6 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from typing import Dict, Any
 from fastapi.responses import PlainTextResponse 
+from starlette.websockets import WebSocketState
 
 from app.chatbot import LocalConnectChatbot
 from app.utils import load_env_variables
@@ -13,6 +18,11 @@ load_env_variables()
 
 chatbot_instance = LocalConnectChatbot()
 
+# WebSocket chat tuning (seconds / counts), overridable from the environment
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "300"))
+WS_MAX_IN_FLIGHT = int(os.getenv("WS_MAX_IN_FLIGHT", "4"))
+
 # Dependency to get the chatbot instance
 def get_chatbot():
     return chatbot_instance
@@ -37,4 +47,139 @@ async def query_chatbot(
     except Exception as e:
         print(f"Error processing query: {e}")
        
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+@router.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    chatbot: LocalConnectChatbot = Depends(get_chatbot)
+):
+    """
+    Long-lived chat channel for one client session.
+
+    Client messages (JSON):
+      {"type": "query", "id": "<request id>", "query": "...", "location": "..."}
+      {"type": "cancel", "id": "<request id>"}
+      {"type": "ping"} / {"type": "pong"}
+
+    Server messages (JSON):
+      {"type": "chunk", "id": ..., "content": "..."}  partial answer
+      {"type": "done", "id": ...}
+      {"type": "cancelled", "id": ...}
+      {"type": "error", "id": ..., "detail": "..."}
+      {"type": "ping"} / {"type": "pong"}
+
+    Several queries may be in flight at once; each runs as its own task so a
+    cancel message aborts the underlying Groq request. Dead peers are detected
+    by uvicorn's protocol-level ping/pong (--ws-ping-interval/--ws-ping-timeout),
+    so clients never have to answer the app-level {"type": "ping"}; it is only
+    a keep-alive for proxies and may be ignored. The server closes the session
+    once nothing is in flight and no query has been sent or answered for
+    WS_IDLE_TIMEOUT seconds.
+    """
+    await websocket.accept()
+
+    loop = asyncio.get_running_loop()
+    send_lock = asyncio.Lock()
+    in_flight: Dict[str, asyncio.Task] = {}
+    last_activity = loop.time()
+
+    async def send(message: Dict[str, Any]):
+        async with send_lock:
+            if websocket.application_state != WebSocketState.CONNECTED:
+                return
+            try:
+                await websocket.send_json(message)
+            except (RuntimeError, WebSocketDisconnect):
+                # Peer went away between the state check and the send
+                pass
+
+    async def close(code: int, reason: str):
+        async with send_lock:
+            if websocket.application_state == WebSocketState.CONNECTED:
+                await websocket.close(code=code, reason=reason)
+
+    async def answer(request_id: str, query: str, location: str):
+        nonlocal last_activity
+        try:
+            async for chunk in chatbot.stream_query(query, location):
+                await send({"type": "chunk", "id": request_id, "content": chunk})
+            await send({"type": "done", "id": request_id})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error streaming query {request_id}: {e}")
+            await send({"type": "error", "id": request_id, "detail": f"Internal server error: {e}"})
+        finally:
+            last_activity = loop.time()
+            # Only drop our own entry; the id may already be reused by a newer query
+            if in_flight.get(request_id) is asyncio.current_task():
+                del in_flight[request_id]
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+            if not in_flight and loop.time() - last_activity > WS_IDLE_TIMEOUT:
+                await close(1000, "idle timeout")
+                return
+            await send({"type": "ping"})
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        while True:
+            try:
+                frame = await websocket.receive()
+            except RuntimeError:
+                # The heartbeat closed the socket while we were waiting
+                break
+            if frame["type"] == "websocket.disconnect":
+                break
+
+            try:
+                message = json.loads(frame.get("text") or "")
+            except ValueError:
+                # Also covers binary frames, which carry no "text"
+                await send({"type": "error", "id": None, "detail": "Message must be valid JSON."})
+                continue
+
+            if not isinstance(message, dict):
+                await send({"type": "error", "id": None, "detail": "Message must be a JSON object."})
+                continue
+
+            message_type = message.get("type")
+            request_id = message.get("id")
+
+            if message_type == "ping":
+                await send({"type": "pong"})
+            elif message_type == "pong":
+                pass
+            elif message_type in ("query", "cancel") and (not request_id or not isinstance(request_id, str)):
+                await send({"type": "error", "id": None, "detail": f"{message_type.capitalize()} requires a string id."})
+            elif message_type == "cancel":
+                last_activity = loop.time()
+                task = in_flight.pop(request_id, None)
+                if task:
+                    task.cancel()
+                    await send({"type": "cancelled", "id": request_id})
+                else:
+                    await send({"type": "error", "id": request_id, "detail": "No request in flight with this id."})
+            elif message_type == "query":
+                last_activity = loop.time()
+                query = message.get("query")
+                location = message.get("location", "current_location")
+                if not query or not isinstance(query, str):
+                    await send({"type": "error", "id": request_id, "detail": "Query cannot be empty."})
+                elif request_id in in_flight:
+                    await send({"type": "error", "id": request_id, "detail": "Request id already in flight."})
+                elif len(in_flight) >= WS_MAX_IN_FLIGHT:
+                    await send({"type": "error", "id": request_id, "detail": "Too many requests in flight."})
+                else:
+                    in_flight[request_id] = asyncio.create_task(answer(request_id, query, location))
+            else:
+                await send({"type": "error", "id": request_id, "detail": f"Unknown message type: {message_type}"})
+    finally:
+        heartbeat_task.cancel()
+        for task in in_flight.values():
+            task.cancel()
+        in_flight.clear()
@@ -48,13 +48,15 @@ class LocalConnectChatbot:
             self.llm_chain = None
             print("LLMChain not initialized due to LLM failure.")
 
-    async def process_query(self, query: str, location: str = "current_location") -> str:
-        location_info = ""
-
+    @staticmethod
+    def _location_info(location: str) -> str:
+        """Normalises the requested location into the prompt's location_info input."""
         if location and location != "current_location":
-            location_info = location
-        else:
-            location_info = "Not provided or default" # Or "" if you prefer to omit
+            return location
+        return "Not provided or default" # Or "" if you prefer to omit
+
+    async def process_query(self, query: str, location: str = "current_location") -> str:
+        location_info = self._location_info(location)
 
         if not self.llm_chain:
             return "I'm sorry, the AI service is not properly initialized. Please check backend logs."
@@ -71,4 +73,20 @@ class LocalConnectChatbot:
             # Though Groq does have rate limits, the error message might be different.
             error_message = f"An error occurred while processing your query with Groq: {e}"
             print(f"Error during LLM or service call: {e}")
-            return error_message
\ No newline at end of file
+            return error_message
+
+    async def stream_query(self, query: str, location: str = "current_location"):
+        """
+        Streams the answer to a user query as partial text chunks.
+        Cancelling the consuming task aborts the underlying Groq request.
+        """
+        location_info = self._location_info(location)
+
+        if not self.llm:
+            yield "I'm sorry, the AI service is not properly initialized. Please check backend logs."
+            return
+
+        chain = self.prompt_template | self.llm
+        async for chunk in chain.astream({"query": query, "location_info": location_info}):
+            if chunk.content:
+                yield chunk.content
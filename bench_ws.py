@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import websockets
+
+# Benchmarks /api/ws/chat at many open sockets on one uvicorn worker.
+#
+# Reports connect time, ping round trip, the worker's RSS per idle socket and
+# RSS per in-flight streaming query. To measure the socket layer rather than
+# Groq latency, --spawn starts a worker whose chatbot is a stub that streams
+# a chunk every --chunk-delay seconds:
+#
+#   python bench_ws.py --spawn --sockets 5000 --streams 2
+#
+# To bench an already running worker instead, pass --url and its --pid.
+# Raise the open-file limit first (ulimit -n 20000).
+
+
+class StubChatbot:
+    """Streams fixed-size chunks forever, standing in for LocalConnectChatbot."""
+
+    def __init__(self, chunk_delay):
+        self.chunk_delay = chunk_delay
+
+    async def stream_query(self, query, location="current_location"):
+        for i in itertools.count():
+            await asyncio.sleep(self.chunk_delay)
+            yield f"{query} partial answer chunk {i:08d}"
+
+
+def serve(port, chunk_delay):
+    import uvicorn
+
+    from app import api
+    from app.main import app
+
+    bot = StubChatbot(chunk_delay)
+    app.dependency_overrides[api.get_chatbot] = lambda: bot
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def read_rss_kb(pid):
+    """Returns the VmRSS of a local process in kB, or None if unavailable."""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class BenchClient:
+    """One socket plus a reader that answers server pings and matches our own pongs."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.probes = collections.deque()
+        self.chunks = 0
+        self.cancelled = 0
+        self.reader = asyncio.create_task(self.read())
+
+    async def read(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                message_type = message["type"]
+                if message_type == "chunk":
+                    self.chunks += 1
+                elif message_type == "ping":
+                    await self.ws.send('{"type": "pong"}')
+                elif message_type == "pong":
+                    self.probes.popleft().set_result(time.perf_counter())
+                elif message_type == "cancelled":
+                    self.cancelled += 1
+                elif message_type == "error":
+                    print(f"Server error: {message}", file=sys.stderr)
+        except websockets.ConnectionClosed:
+            # A server ping can still arrive while we are closing
+            pass
+
+    async def probe(self):
+        """Sends an app-level ping and returns the round trip in seconds."""
+        future = asyncio.get_running_loop().create_future()
+        self.probes.append(future)
+        start = time.perf_counter()
+        await self.ws.send('{"type": "ping"}')
+        return await future - start
+
+    async def close(self):
+        await self.ws.close()
+        await self.reader
+
+
+async def connect(url):
+    ws = await websockets.connect(url, ping_interval=None, max_queue=None)
+    return BenchClient(ws)
+
+
+async def measure_rtt(clients):
+    rtts = sorted(await asyncio.gather(*(c.probe() for c in clients)))
+    return rtts[len(rtts) // 2] * 1000, rtts[int(len(rtts) * 0.99)] * 1000
+
+
+async def settled_rss(pid, settle):
+    await asyncio.sleep(settle)
+    return read_rss_kb(pid)
+
+
+async def run(args, pid):
+    rss_base = await settled_rss(pid, args.settle)
+
+    clients = []
+    start = time.perf_counter()
+    for i in range(0, args.sockets, args.batch):
+        count = min(args.batch, args.sockets - i)
+        clients += await asyncio.gather(*(connect(args.url) for _ in range(count)))
+    print(f"Opened {len(clients)} sockets in {time.perf_counter() - start:.2f}s")
+
+    rss_idle = await settled_rss(pid, args.settle)
+    p50, p99 = await measure_rtt(clients)
+    print(f"Ping round trip, idle: p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+    if args.streams:
+        for n in range(args.streams):
+            await asyncio.gather(*(
+                c.ws.send(json.dumps({"type": "query", "id": f"q{n}", "query": f"q{n}"}))
+                for c in clients
+            ))
+        rss_streams = await settled_rss(pid, args.settle)
+
+        before = sum(c.chunks for c in clients)
+        await asyncio.sleep(args.hold)
+        rate = (sum(c.chunks for c in clients) - before) / args.hold
+        print(f"{len(clients) * args.streams} streams in flight, {rate:.0f} chunks/s delivered")
+        p50, p99 = await measure_rtt(clients)
+        print(f"Ping round trip, streaming: p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+        for n in range(args.streams):
+            await asyncio.gather(*(c.ws.send(json.dumps({"type": "cancel", "id": f"q{n}"})) for c in clients))
+    else:
+        await asyncio.sleep(args.hold)
+
+    if rss_base is not None:
+        print(f"Worker RSS: {rss_base} kB at start, {rss_idle} kB with idle sockets "
+              f"({(rss_idle - rss_base) / len(clients):.1f} kB per socket)")
+        if args.streams:
+            per_stream = (rss_streams - rss_idle) / (len(clients) * args.streams)
+            print(f"Worker RSS with streams: {rss_streams} kB ({per_stream:.1f} kB per in-flight stream)")
+
+    await asyncio.gather(*(c.close() for c in clients))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark open WebSocket chat connections.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/api/ws/chat")
+    parser.add_argument("--pid", type=int, help="PID of the uvicorn worker to sample memory from.")
+    parser.add_argument("--spawn", action="store_true", help="Start a stub-chatbot worker to bench against.")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chunk-delay", type=float, default=0.5, help="Stub seconds between chunks.")
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--streams", type=int, default=0, help="Streaming queries kept in flight per socket.")
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--hold", type=float, default=10.0, help="Seconds to keep sockets open.")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait before sampling RSS.")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.chunk_delay)
+        return
+
+    if not args.spawn:
+        asyncio.run(run(args, args.pid))
+        return
+
+    env = dict(os.environ, WS_MAX_IN_FLIGHT=str(max(args.streams, 1)))
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(args.port), "--chunk-delay", str(args.chunk_delay)],
+        env=env,
+    )
+    args.url = f"ws://127.0.0.1:{args.port}/api/ws/chat"
+    try:
+        time.sleep(3)
+        asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
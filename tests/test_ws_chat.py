@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import api
+from app.main import app
+
+
+class SlowChatbot:
+    """Stands in for LocalConnectChatbot, streaming numbered chunks slowly."""
+
+    def __init__(self, chunks=3, delay=0.05):
+        self.chunks = chunks
+        self.delay = delay
+        self.started = []
+        self.finished = []
+        self.aborted = []
+
+    async def stream_query(self, query, location="current_location"):
+        self.started.append(query)
+        try:
+            for i in range(self.chunks):
+                await asyncio.sleep(self.delay)
+                yield f"{query}-{i}"
+        except asyncio.CancelledError:
+            self.aborted.append(query)
+            raise
+        self.finished.append(query)
+
+
+@pytest.fixture
+def chatbot():
+    bot = SlowChatbot()
+    app.dependency_overrides[api.get_chatbot] = lambda: bot
+    yield bot
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def receive_until(ws, predicate):
+    """Collects server messages (skipping keep-alive pings) until predicate matches one."""
+    messages = []
+    while True:
+        message = ws.receive_json()
+        if message["type"] == "ping":
+            continue
+        messages.append(message)
+        if predicate(message):
+            return messages
+
+
+def test_two_queries_stream_interleaved(client, chatbot):
+    with client.websocket_connect("/api/ws/chat") as ws:
+        ws.send_json({"type": "query", "id": "a", "query": "alpha"})
+        ws.send_json({"type": "query", "id": "b", "query": "beta"})
+
+        done = set()
+        messages = receive_until(ws, lambda m: m["type"] == "done" and (done.add(m["id"]) or done == {"a", "b"}))
+
+    chunks = [(m["id"], m["content"]) for m in messages if m["type"] == "chunk"]
+    assert [c for i, c in chunks if i == "a"] == ["alpha-0", "alpha-1", "alpha-2"]
+    assert [c for i, c in chunks if i == "b"] == ["beta-0", "beta-1", "beta-2"]
+    # Both streams make progress before either finishes
+    first_done = next(n for n, m in enumerate(messages) if m["type"] == "done")
+    assert {m["id"] for m in messages[:first_done] if m["type"] == "chunk"} == {"a", "b"}
+
+
+def test_cancel_stops_generator(client, chatbot):
+    chatbot.chunks = 50
+    with client.websocket_connect("/api/ws/chat") as ws:
+        ws.send_json({"type": "query", "id": "a", "query": "alpha"})
+        receive_until(ws, lambda m: m["type"] == "chunk")
+        ws.send_json({"type": "cancel", "id": "a"})
+        receive_until(ws, lambda m: m["type"] == "cancelled" and m["id"] == "a")
+
+        # The session is still usable and the cancelled id can be reused
+        chatbot.chunks = 1
+        ws.send_json({"type": "query", "id": "a", "query": "again"})
+        messages = receive_until(ws, lambda m: m["type"] == "done")
+
+    assert chatbot.aborted == ["alpha"]
+    assert "alpha" not in chatbot.finished
+    assert [m["content"] for m in messages if m["type"] == "chunk"] == ["again-0"]
+
+
+def test_cancel_unknown_id_reports_error(client, chatbot):
+    with client.websocket_connect("/api/ws/chat") as ws:
+        ws.send_json({"type": "cancel", "id": "missing"})
+        assert ws.receive_json() == {"type": "error", "id": "missing", "detail": "No request in flight with this id."}
+
+
+def test_duplicate_id_rejected(client, chatbot):
+    chatbot.chunks = 50
+    with client.websocket_connect("/api/ws/chat") as ws:
+        ws.send_json({"type": "query", "id": "a", "query": "alpha"})
+        ws.send_json({"type": "query", "id": "a", "query": "again"})
+        messages = receive_until(ws, lambda m: m["type"] == "error")
+
+    assert messages[-1] == {"type": "error", "id": "a", "detail": "Request id already in flight."}
+    assert chatbot.started == ["alpha"]
+
+
+def test_too_many_in_flight_rejected(client, chatbot, monkeypatch):
+    monkeypatch.setattr(api, "WS_MAX_IN_FLIGHT", 2)
+    chatbot.chunks = 50
+    with client.websocket_connect("/api/ws/chat") as ws:
+        for request_id in ("a", "b", "c"):
+            ws.send_json({"type": "query", "id": request_id, "query": request_id})
+        messages = receive_until(ws, lambda m: m["type"] == "error")
+
+    assert messages[-1] == {"type": "error", "id": "c", "detail": "Too many requests in flight."}
+    assert sorted(chatbot.started) == ["a", "b"]
+
+
+@pytest.mark.parametrize("send, detail", [
+    (lambda ws: ws.send_text("not json"), "Message must be valid JSON."),
+    (lambda ws: ws.send_bytes(b"\x00\x01"), "Message must be valid JSON."),
+    (lambda ws: ws.send_json(["a", "list"]), "Message must be a JSON object."),
+    (lambda ws: ws.send_json({"type": "cancel", "id": ["unhashable"]}), "Cancel requires a string id."),
+    (lambda ws: ws.send_json({"type": "query", "id": {"x": 1}, "query": "hi"}), "Query requires a string id."),
+    (lambda ws: ws.send_json({"type": "query", "id": "a"}), "Query cannot be empty."),
+    (lambda ws: ws.send_json({"type": "bogus"}), "Unknown message type: bogus"),
+])
+def test_malformed_messages_keep_socket_alive(client, chatbot, send, detail):
+    chatbot.chunks = 1
+    with client.websocket_connect("/api/ws/chat") as ws:
+        send(ws)
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert error["detail"] == detail
+
+        ws.send_json({"type": "query", "id": "ok", "query": "ok"})
+        messages = receive_until(ws, lambda m: m["type"] == "done")
+
+    assert [m["content"] for m in messages if m["type"] == "chunk"] == ["ok-0"]
+
+
+def test_ping_gets_pong(client, chatbot):
+    with client.websocket_connect("/api/ws/chat") as ws:
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+
+def test_idle_timeout_closes_session(client, chatbot, monkeypatch):
+    monkeypatch.setattr(api, "WS_HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(api, "WS_IDLE_TIMEOUT", 0.1)
+    with client.websocket_connect("/api/ws/chat") as ws:
+        while True:
+            message = ws.receive()
+            if message["type"] == "websocket.close":
+                break
+    assert message["code"] == 1000
+    assert message["reason"] == "idle timeout"
+
+
+def test_long_stream_does_not_trigger_idle_timeout(client, chatbot, monkeypatch):
+    # The answer outlasts WS_IDLE_TIMEOUT and the client sends nothing back
+    monkeypatch.setattr(api, "WS_HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(api, "WS_IDLE_TIMEOUT", 0.2)
+    chatbot.chunks = 6
+    with client.websocket_connect("/api/ws/chat") as ws:
+        ws.send_json({"type": "query", "id": "a", "query": "alpha"})
+        receive_until(ws, lambda m: m["type"] == "done")
+
+        # Right after the answer the session must still be open
+        ws.send_json({"type": "ping"})
+        assert receive_until(ws, lambda m: m["type"] == "pong")[-1] == {"type": "pong"}